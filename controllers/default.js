@@ -1,11 +1,57 @@
 const Pty = require('node-pty');
 const fs = require('fs');
+const crypto = require('crypto');
+
+// Seconds a session is kept alive after its connection has been closed
+const SESSION_GRACE_PERIOD = parseInt(process.env.SESSION_GRACE_PERIOD || '300') * 1000;
+// While other clients are waiting for a free session, detached sessions are
+// only kept for up to 30 seconds
+const QUEUED_GRACE_PERIOD = Math.min(SESSION_GRACE_PERIOD, 30000);
+// Seconds without any input after which a session is killed
+const SESSION_IDLE_TIMEOUT = parseInt(process.env.SESSION_IDLE_TIMEOUT || '3600') * 1000;
+// Output since the screen was last cleared is kept up to this size and shown
+// again when a client reattaches to the session
+const OUTPUT_HISTORY_SIZE = 64 * 1024;
+// Terminal sequences to clear the screen: https://invisible-island.net/
+// xterm/ctlseqs/ctlseqs.html
+const CLEAR_SCREEN = '\x1b[2J';
+const CURSOR_HOME = '\x1b[H';
+// Terminal output is collected for up to this many milliseconds or bytes and
+// sent as a single frame
+const OUTPUT_FRAME_INTERVAL = parseInt(process.env.OUTPUT_FRAME_INTERVAL || '10');
+const OUTPUT_FRAME_SIZE = parseInt(process.env.OUTPUT_FRAME_SIZE || '16384');
+// The program is paused while more than this many bytes wait to be sent
+const OUTPUT_HIGH_WATER = parseInt(process.env.OUTPUT_HIGH_WATER || '262144');
+// Maximum number of programs running at the same time. Further clients wait
+// in a queue until a program has ended.
+const MAX_SESSIONS = parseInt(process.env.MAX_SESSIONS || '10');
+// Limits for each program: CPU time in seconds and memory in megabytes (0 for
+// no limit)
+const SESSION_CPU_LIMIT = parseInt(process.env.SESSION_CPU_LIMIT || '300');
+const SESSION_MEMORY_LIMIT = parseInt(process.env.SESSION_MEMORY_LIMIT || '1024');
+// Throughput counters of all sessions are only available at /sessions/ if
+// this is set to 'true', since they show the activity of every user
+const SESSION_STATS = process.env.SESSION_STATS === 'true';
+// Signal sent to a program which has used up its CPU time
+const SIGXCPU = 24;
+// Close codes telling the browser not to reconnect
+const CLOSE_SESSION_ENDED = 4000;
+const CLOSE_SESSION_TAKEN_OVER = 4001;
+
+// Running sessions by session token
+const sessions = {};
+// Clients waiting for a free session
+const queue = [];
 
 exports.install = function () {
 
     ROUTE('/');
+    if (SESSION_STATS)
+        ROUTE('GET /sessions/', sessionStats);
     WEBSOCKET('/', socket, ['raw']);
 
+    setInterval(reapSessions, 10000);
+
 };
 
 function socket() {
@@ -15,40 +61,288 @@ function socket() {
 
     this.on('open', function (client) {
 
-        // Spawn terminal
-        client.tty = Pty.spawn('python3', ['run.py'], {
-            name: 'xterm-color',
-            cols: 80,
-            rows: 24,
-            cwd: process.env.PWD,
-            env: process.env
-        });
+        var token = client.query.session;
+        if (!/^[a-f0-9]{32}$/.test(token || ''))
+            token = crypto.randomBytes(16).toString('hex');
 
-        client.tty.on('exit', function (code, signal) {
-            client.tty = null;
-            client.close();
-            console.log("Process killed");
-        });
+        var session = sessions[token];
 
-        client.tty.on('data', function (data) {
-            client.send(data);
+        var waiting = queue.find(function (item) {
+            return item.token === token;
         });
 
+        if (waiting) {
+            // Reconnect to the place in the queue
+            if (waiting.client)
+                waiting.client.close('Session opened in another window', CLOSE_SESSION_TAKEN_OVER);
+            waiting.client = client;
+            waiting.detached = 0;
+            client.waiting = waiting;
+            sendQueuePosition(waiting);
+            return;
+        }
+
+        if (session) {
+            // Reattach to the running session and redraw the screen, since
+            // the terminal of a reloaded page is empty
+            if (session.client)
+                session.client.close('Session opened in another window', CLOSE_SESSION_TAKEN_OVER);
+            session.client = client;
+            session.detached = 0;
+            session.pending = CURSOR_HOME + CLEAR_SCREEN + session.history;
+            flushOutput(session);
+            console.log("Session reattached");
+        } else if (Object.keys(sessions).length >= MAX_SESSIONS) {
+            client.waiting = { token: token, client: client, detached: 0 };
+            queue.push(client.waiting);
+            sendQueuePosition(client.waiting);
+            console.log("Session queued");
+            return;
+        } else {
+            session = createSession(token, client);
+        }
+
+        session.active = Date.now();
+        client.session = session;
+
     });
 
     this.on('close', function (client) {
-        if (client.tty) {
-            client.tty.kill(9);
-            client.tty = null;
-            console.log("Process killed and terminal unloaded");
+        var waiting = client.waiting;
+        if (waiting && waiting.client === client) {
+            // Keep the place in the queue for the grace period
+            waiting.client = null;
+            waiting.detached = Date.now();
+            return;
+        }
+
+        var session = client.session;
+        if (session && session.client === client) {
+            // Keep the session alive for the grace period
+            session.client = null;
+            session.detached = Date.now();
+            detachOutput(session);
+            console.log("Session detached");
         }
     });
 
     this.on('message', function (client, msg) {
-        client.tty && client.tty.write(msg);
+        var session = client.session;
+        if (session && session.tty) {
+            session.active = Date.now();
+            session.stats.messagesIn++;
+            session.stats.bytesIn += Buffer.byteLength(msg);
+            session.tty.write(msg);
+        }
     });
 }
 
+function createSession(token, client) {
+
+    var session = {
+        token: token,
+        client: client,
+        history: '',
+        pending: '',
+        timer: null,
+        paused: false,
+        active: Date.now(),
+        detached: client ? 0 : Date.now(),
+        stats: {
+            started: Date.now(),
+            chunksOut: 0,
+            framesOut: 0,
+            bytesOut: 0,
+            messagesIn: 0,
+            bytesIn: 0,
+            pauses: 0
+        }
+    };
+
+    // Spawn terminal with resource limits: https://man7.org/linux/man-pages/
+    // man1/dash.1.html (ulimit)
+    var command = 'exec python3 run.py';
+    if (SESSION_MEMORY_LIMIT > 0)
+        command = 'ulimit -v ' + SESSION_MEMORY_LIMIT * 1024 + ' && ' + command;
+    if (SESSION_CPU_LIMIT > 0)
+        command = 'ulimit -t ' + SESSION_CPU_LIMIT + ' && ' + command;
+
+    session.tty = Pty.spawn('/bin/sh', ['-c', command], {
+        name: 'xterm-color',
+        cols: 80,
+        rows: 24,
+        cwd: process.env.PWD,
+        env: process.env
+    });
+
+    session.tty.on('exit', function (code, signal) {
+        session.tty = null;
+        delete sessions[token];
+        if (signal === SIGXCPU)
+            session.pending += '\r\nThe program has been stopped, because it used too much CPU time.\r\n';
+        flushOutput(session);
+        session.client && session.client.close('Session ended', CLOSE_SESSION_ENDED);
+        console.log("Process killed");
+        startQueuedSession();
+    });
+
+    session.tty.on('data', function (data) {
+        session.stats.chunksOut++;
+        keepOutput(session, data);
+        if (session.client) {
+            session.pending += data;
+            if (session.pending.length >= OUTPUT_FRAME_SIZE)
+                flushOutput(session);
+            else if (!session.timer)
+                session.timer = setTimeout(flushOutput, OUTPUT_FRAME_INTERVAL, session);
+        }
+    });
+
+    sessions[token] = session;
+    console.log("Session started");
+
+    return session;
+}
+
+// Send the collected output as one frame and pause the program while the
+// client can't keep up
+function flushOutput(session) {
+    clearTimeout(session.timer);
+    session.timer = null;
+
+    var client = session.client;
+    if (!client || !session.pending)
+        return;
+
+    client.send(session.pending);
+    session.stats.framesOut++;
+    session.stats.bytesOut += Buffer.byteLength(session.pending);
+    session.pending = '';
+
+    if (session.tty && !session.paused && client.socket.writableLength > OUTPUT_HIGH_WATER) {
+        session.paused = true;
+        session.stats.pauses++;
+        session.tty.pause();
+        client.socket.once('drain', function () {
+            resumeOutput(session);
+        });
+    }
+}
+
+function resumeOutput(session) {
+    if (session.paused) {
+        session.paused = false;
+        session.tty && session.tty.resume();
+    }
+}
+
+// Keep the output since the screen was last cleared, so that the screen can
+// be redrawn for the next client
+function keepOutput(session, data) {
+    var cleared = data.lastIndexOf(CLEAR_SCREEN);
+    if (cleared >= 0)
+        session.history = data.slice(cleared + CLEAR_SCREEN.length);
+    else
+        session.history = (session.history + data).slice(-OUTPUT_HISTORY_SIZE);
+}
+
+// Drop the output which has not been sent yet, it is part of the history
+function detachOutput(session) {
+    clearTimeout(session.timer);
+    session.timer = null;
+    session.pending = '';
+    resumeOutput(session);
+}
+
+// Throughput counters of all running sessions
+function sessionStats() {
+    var now = Date.now();
+    var list = [];
+    for (var token in sessions) {
+        var session = sessions[token];
+        var seconds = (now - session.stats.started) / 1000;
+        list.push({
+            // Sessions are numbered, their tokens are never shown
+            session: list.length + 1,
+            attached: !!session.client,
+            paused: session.paused,
+            seconds: Math.round(seconds),
+            chunksOut: session.stats.chunksOut,
+            framesOut: session.stats.framesOut,
+            bytesOut: session.stats.bytesOut,
+            bytesOutPerSecond: Math.round(session.stats.bytesOut / seconds),
+            messagesIn: session.stats.messagesIn,
+            bytesIn: session.stats.bytesIn,
+            pauses: session.stats.pauses
+        });
+    }
+    this.json(list);
+}
+
+// Start a session for the first client in the queue. If the client is
+// reconnecting, the session starts detached and the client reattaches to it.
+function startQueuedSession() {
+    var waiting = queue.shift();
+    if (!waiting)
+        return;
+
+    var client = waiting.client;
+    if (client) {
+        client.waiting = null;
+        // Clear the waiting message
+        client.send(CURSOR_HOME + CLEAR_SCREEN);
+    }
+    var session = createSession(waiting.token, client);
+    if (client)
+        client.session = session;
+    queue.forEach(sendQueuePosition);
+}
+
+function sendQueuePosition(waiting) {
+    waiting.client && waiting.client.send('\r\nAll sessions are busy at the moment. Your position in the queue: ' + (queue.indexOf(waiting) + 1) + '\r\n');
+}
+
+function killSession(session) {
+    if (session.tty) {
+        session.tty.kill(9);
+        session.tty = null;
+    }
+    delete sessions[session.token];
+    session.client && session.client.close('Session ended', CLOSE_SESSION_ENDED);
+}
+
+// Kill sessions which have been detached longer than the grace period or
+// which have not received any input for too long, and drop clients from the
+// queue which have not reconnected within the grace period
+function reapSessions() {
+    var now = Date.now();
+
+    var left = queue.filter(function (waiting) {
+        return waiting.detached && now - waiting.detached > SESSION_GRACE_PERIOD;
+    });
+    left.forEach(function (waiting) {
+        queue.splice(queue.indexOf(waiting), 1);
+    });
+    if (left.length)
+        queue.forEach(sendQueuePosition);
+
+    var clientsWaiting = queue.some(function (waiting) {
+        return waiting.client;
+    });
+    var gracePeriod = clientsWaiting ? QUEUED_GRACE_PERIOD : SESSION_GRACE_PERIOD;
+
+    for (var token in sessions) {
+        var session = sessions[token];
+        if (session.detached && now - session.detached > gracePeriod) {
+            killSession(session);
+            console.log("Process killed and terminal unloaded");
+        } else if (now - session.active > SESSION_IDLE_TIMEOUT) {
+            killSession(session);
+            console.log("Idle process killed and terminal unloaded");
+        }
+    }
+}
+
 if (process.env.CREDS != null) {
     console.log("Creating creds.json file.");
     fs.writeFile('creds.json', process.env.CREDS, 'utf8', function (err) {
@@ -57,4 +351,4 @@ if (process.env.CREDS != null) {
             socket.emit("console_output", "Error saving credentials: " + err);
         }
     });
-}
\ No newline at end of file
+}
@@ -1,12 +1,19 @@
 import os
+import sys
 import time
+import zlib
 import re
 import random
 import string
+import operator
+from array import array
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 import gspread
 from spellchecker import SpellChecker
 from nltk.tokenize import word_tokenize
 from nltk.stem import WordNetLemmatizer
+from nltk.stem import SnowballStemmer
 from nltk.corpus import wordnet
 from nltk.corpus import stopwords
 from termcolor import colored
@@ -18,14 +25,90 @@ SCOPE = [
     "https://www.googleapis.com/auth/drive.file",
     "https://www.googleapis.com/auth/drive",
 ]
-CREDS = Credentials.from_service_account_file("creds.json")
-SCOPED_CREDS = CREDS.with_scopes(SCOPE)
-GSPREAD_CLIENT = gspread.authorize(SCOPED_CREDS)
-SHEET = GSPREAD_CLIENT.open("text-inspector-storage")
 
 SEPARATOR = "------------------------------"
 storage = {}
 
+# Fast word tokenizer: Emulates the token boundaries of NLTK's
+# word_tokenize() with a single precompiled pattern and only matches the
+# tokens count_words() treats as words (letters, optionally joined by word
+# characters or single hyphens). Letters include accented letters, e.g. in
+# "café" or "está". Boundary rules are taken from the NLTKWordTokenizer
+# source: https://www.nltk.org/_modules/nltk/tokenize/destructive.html
+SPLIT_CHARACTERS = r"«“‘„”’»`\";@#$%&?!*()\[\]{}<>"
+TOKEN_BOUNDARY = (
+    rf"$|[{SPLIT_CHARACTERS}]|''|[,:](?!\d)|--|\.\."
+    r"|\.(?=[\])}\"'»”’]*(?:\s|$))"
+)
+WORD_PATTERN = re.compile(
+    # Contractions NLTK splits wherever they occur, e.g. "cannot"
+    r"(?<!\w)(?i:cannot|d'ye|gimme|gonna|gotta|lemme|more'n)(?!\w)"
+    rf"|(?:^|(?<=[\s{SPLIT_CHARACTERS},:])|(?<=''|\.\.)|(?<=(?<!-)--))"
+    r"(?:(?i:wanna|'tis|'twas)|[^\W\d_](?:(?:\w|-(?!-))*[^\W\d_])?)"
+    rf"(?=\s|{TOKEN_BOUNDARY}"
+    rf"|(?:'(?:[sSmMdD]|ll|LL|re|RE|ve|VE)?|n't|N'T)(?: |{TOKEN_BOUNDARY}))"
+)
+CONTRACTIONS = {
+    "cannot": 3,
+    "d'ye": 1,
+    "gimme": 3,
+    "gonna": 3,
+    "gotta": 3,
+    "lemme": 3,
+    "more'n": 4,
+    "wanna": 3,
+    "'tis": 2,
+    "'twas": 2,
+}
+
+# Near-duplicate detection with MinHash signatures and locality-sensitive
+# hashing: https://en.wikipedia.org/wiki/MinHash
+SHINGLE_SIZE = 3
+SIGNATURE_SIZE = 64
+SIGNATURE_BANDS = 16
+SIMILARITY_THRESHOLD = 0.5
+# Signatures store 32-bit hashes, which is plenty for texts of a few
+# thousand words and takes half the memory of 64-bit hashes:
+HASH_MASKS = [
+    random.Random(seed).getrandbits(32) for seed in range(SIGNATURE_SIZE)
+]
+
+# Words and sentence separators for text metrics:
+SENTENCE_PATTERN = re.compile(rf"{WORD_PATTERN.pattern}|[.!?]+")
+VOWEL_GROUPS = re.compile(r"[aeiouyàáâäãåèéêëìíîïòóôöõùúûüýÿæœ]+")
+
+# Words for the search index. Hyphenated words are kept together, possessives
+# are split off, so that "Brooke's" is found when searching for "Brooke":
+SEARCH_PATTERN = re.compile(r"\w+(?:-\w+)*")
+# Supported languages with their pyspellchecker codes and NLTK names:
+LANGUAGES = {
+    "en": "english",
+    "de": "german",
+    "es": "spanish",
+    "fr": "french",
+}
+# Very common words, which only occur in one of the languages. They are used
+# to detect the language of a text without loading any language resources.
+LANGUAGE_MARKERS = {
+    "en": {"the", "and", "of", "to", "is", "that", "it", "was", "with"},
+    "de": {"der", "die", "und", "das", "ist", "nicht", "ein", "mit", "sich"},
+    "es": {"el", "los", "las", "del", "y", "por", "con", "una", "para"},
+    "fr": {"le", "les", "et", "des", "est", "une", "du", "pas", "dans"},
+}
+DETECTION_SAMPLE = 5000
+
+# Number of decompressed texts kept in memory for quick access:
+HOT_TEXTS = 8
+
+# Number of upcoming spelling errors for which suggestions are prepared in
+# the background during the spell check:
+PREFETCH_SIZE = 5
+# Number of tokens (words, spaces and punctuation) shown before and after an
+# error in the grouped spell check:
+CONTEXT_SIZE = 16
+# Possessive ending, which is split off to group spelling errors:
+POSSESSIVE_ENDING = re.compile(r"[ʼ'’][sS]$")
+
 
 class Text:
     """Creates an instance of a text.
@@ -33,7 +116,9 @@ class Text:
 
     Attributes:
     - title: Title of the text instance provided by user
-    - text: Text contents provided by user
+    - text: Text contents provided by user. The text is stored compressed
+      in body and decompressed on access.
+    - language: Language code of the text, detected from its contents
 
     Methods:
     - get_title(): Get the title for the text from user
@@ -41,20 +126,40 @@ class Text:
     - user_input(): Read text from command line interface
     - file_input(): Read text from file
     - spell_check(): Run a spell check on text
+    - grouped_spell_check(): Run a spell check with one prompt per error
     - suggest_synonyms(): Suggest synonyms for repeated words
     - no_suggestions(): Display a message when there are no suggestions
     - display_text(): Prints the revised text to the console
     - display_metrics(): Display text metrics
-    - count_words(): Get total/unique word count and word frequency
-    - count_sentences(): Get total sentences, longest/shortest sentence and
-      average words per sentence
+    - count_words(): Get word and sentence counts, word frequency and style
+      metrics
+    - get_signature(): Get the cached MinHash signature of the text
     - save_text(): Add the text item to storage
     """
 
+    # Slots save the memory of an instance dictionary for every stored text:
+    # https://docs.python.org/3/reference/datamodel.html#slots
+    __slots__ = ("title", "body", "language", "signature", "signed_body")
+
     def __init__(self, new_text):
+        self.body = None
+        self.signature = None
+        self.signed_body = None
+        self.language = "en"
         if new_text:
             self.title = self.get_title()
             self.text = self.get_text()
+            self.language = detect_language(self.text)
+
+    @property
+    def text(self):
+        """Get the decompressed text"""
+        return decompress_text(self.body)
+
+    @text.setter
+    def text(self, text):
+        """Store the text compressed"""
+        self.body = zlib.compress(text.encode())
 
     def get_title(self):
         """Get instance title from user input"""
@@ -186,23 +291,21 @@ class Text:
                     )
                 )
 
-    def spell_check(self):
+    def spell_check(self, grouped=False):
         """Check for spelling errors in the selected text"""
-        # pyspellchecker documentation: https://pyspellchecker.readthedocs.io
-        # /en/latest/
-        spell = SpellChecker(language="en")
+        spell = get_spell_checker(self.language)
         # Split text into list with words and punctuation: https://
         # stackoverflow.com/questions/367155/splitting-a-string-into-words-and-
         # punctuation
-        tokenized_text = re.findall(
-            r"[a-zA-Z0-9ʼ'’_-]+|[^a-zA-Z0-9'ʼ’_-]", self.text
-        )
-        all_words = re.findall(r"[a-zA-Z0-9ʼ'’_-]+", self.text)
+        tokenized_text = re.findall(r"[\wʼ'’-]+|[^\w'ʼ’-]", self.text)
+        all_words = re.findall(r"[\wʼ'’-]+", self.text)
         misspelled = [word for word in all_words if spell.unknown([word])]
 
         corrected_text = []
 
-        def display_spelling_suggestions(word, suggestions, total, index):
+        def display_spelling_suggestions(
+            word, suggestions, total, index, occurrences=None, context=None
+        ):
             """Display suggestions one by one and let user accept, edit or
             skip to next
             """
@@ -215,6 +318,10 @@ class Text:
             print(f"\n{total} possible spelling errors found.")
             print(f"\nPossible spelling error: {colored(word, 'red')}")
             print(f"(Error {index} of {total})")
+            if occurrences is not None:
+                times = "once" if occurrences == 1 else f"{occurrences} times"
+                print(f"\nOccurs {times} in the text, e.g.:")
+                print(f"...{context}...")
             print("\nPlease choose one of the following suggestions:\n")
 
             option_count = 1
@@ -271,22 +378,88 @@ class Text:
                     )
                     time.sleep(2)
 
+        # Suggestions for the next few errors are looked up on a background
+        # thread, while the user is answering the current prompt:
+        # https://docs.python.org/3/library/concurrent.futures.html
+        prefetched = {}
+        misspelled_words = set(misspelled)
+
+        def prefetch(errors, index):
+            """Look up suggestions for the errors up to PREFETCH_SIZE ahead"""
+            for word in errors[index - 1:index + PREFETCH_SIZE]:
+                if word not in prefetched:
+                    prefetched[word] = executor.submit(spell.candidates, word)
+
         index = 1
-        if len(misspelled) != 0:
+        if len(misspelled) != 0 and grouped:
+            # Errors are grouped by the word the spell checker looks up
+            # (lowercase and without a possessive ending), so that e.g.
+            # "Teh", "teh" and "Teh's" are corrected together. Count the
+            # occurrences of each error and find its first position for the
+            # context sample:
+            occurrences = {}
+            first_positions = {}
+            for position, word in enumerate(tokenized_text):
+                if word in misspelled_words:
+                    error = split_possessive(word)[0].lower()
+                    occurrences[error] = occurrences.get(error, 0) + 1
+                    first_positions.setdefault(error, position)
+
+            # Possessives of known words, e.g. names, are no errors:
+            errors = [error for error in occurrences if spell.unknown([error])]
+            replacements = {}
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                for index, error in enumerate(errors, 1):
+                    prefetch(errors, index)
+                    position = first_positions[error]
+                    word = split_possessive(tokenized_text[position])[0]
+                    start = max(position - CONTEXT_SIZE, 0)
+                    end = position + CONTEXT_SIZE + 1
+                    context = (
+                        "".join(tokenized_text[start:position])
+                        + colored(tokenized_text[position], "red")
+                        + "".join(tokenized_text[position + 1:end])
+                    ).replace("\n", " ")
+                    replacement = display_spelling_suggestions(
+                        word,
+                        prefetched[error].result(),
+                        len(errors),
+                        index,
+                        occurrences[error],
+                        context,
+                    )
+                    if replacement != word:
+                        replacements[error] = replacement
+
+            # Apply the replacements to all occurrences at once, keeping
+            # their capitalization and possessive endings:
             for word in tokenized_text:
-                if word in misspelled:
-                    suggestions = spell.candidates(word)
-                    # Call display_suggestions method and pass it the
-                    # current word and its suggestions
-                    corrected_text.append(
-                        display_spelling_suggestions(
-                            word, suggestions, len(misspelled), index
+                if word in misspelled_words:
+                    base, ending = split_possessive(word)
+                    replacement = replacements.get(base.lower())
+                    if replacement is not None:
+                        word = match_case(replacement, base) + ending
+                corrected_text.append(word)
+            # Without errors left after grouping, there is nothing to show:
+            misspelled = errors
+        elif len(misspelled) != 0:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                for word in tokenized_text:
+                    if word in misspelled_words:
+                        prefetch(misspelled, index)
+                        suggestions = prefetched[word].result()
+                        # Call display_suggestions method and pass it the
+                        # current word and its suggestions
+                        corrected_text.append(
+                            display_spelling_suggestions(
+                                word, suggestions, len(misspelled), index
+                            )
                         )
-                    )
-                    index += 1
-                else:
-                    corrected_text.append(word)
+                        index += 1
+                    else:
+                        corrected_text.append(word)
 
+        if len(misspelled) != 0:
             self.text = "".join(corrected_text)
 
             display_header()
@@ -294,14 +467,23 @@ class Text:
         else:
             self.no_suggestions("Spell check")
 
+    def grouped_spell_check(self):
+        """Correct each spelling error once for all its occurrences"""
+        self.spell_check(grouped=True)
+
     def suggest_synonyms(self):
         """Check for repeating words and suggest synonyms"""
+        # Synonyms are taken from WordNet, which is only available in English:
+        if self.language != "en":
+            self.no_suggestions("Synonyms")
+            return
+
         tokenized_text = re.findall(
             r"[\w'-]+|[ .,!?@#$%&*;:<>=()[\]{}\n]", self.text
         )
         # Get most frequent words from count_words() and convert it to
         # dictionary
-        most_used_words = dict(self.count_words()[2])
+        most_used_words = dict(self.count_words()["most_used_words"])
 
         def display_synonym_suggestions(
             word, count, suggestions, total, index
@@ -398,29 +580,57 @@ class Text:
         """Display metrics for the seleced text"""
         display_header()
 
-        total_words, unique_words, most_used_words = self.count_words()
-        total_sentences, sentence_lengths = self.count_sentences()
+        metrics = self.count_words()
+        total_words = metrics["total_words"]
 
         print(SEPARATOR)
         print("Text Metrics:")
         print(SEPARATOR)
         print(f"Selected Text: {colored(self.title, 'yellow')}\n")
+        print(f"Language: {LANGUAGES[self.language].capitalize()}")
         print(f"Words: {total_words}")
-        print(f"Unique words: {len(unique_words)}")
-        print(f"Sentences: {total_sentences}")
-        print(f"Longest sentence: {max(sentence_lengths)} words")
-        print(f"Shortest sentence: {min(sentence_lengths)} words")
+        print(f"Unique words: {len(metrics['unique_words'])}")
+        print(f"Sentences: {metrics['total_sentences']}")
+        print(
+            "Longest sentence:"
+            f" {max(metrics['sentence_lengths'], default=0)} words"
+        )
+        print(
+            "Shortest sentence:"
+            f" {min(metrics['sentence_lengths'], default=0)} words"
+        )
         print(
             "Average words per sentence:"
-            f" {round(total_words / total_sentences)}"
+            f" {round(metrics['words_per_sentence'])}"
         )
+        print(
+            f"Average word length: {round(metrics['word_length'], 1)}"
+            " characters"
+        )
+        print(
+            "Lexical density:"
+            f" {round(metrics['content_words'] / max(total_words, 1) * 100)}%"
+        )
+
+        # Syllable counting and the readability formulas are made for
+        # English:
+        print("\nReadability:")
+        if self.language == "en":
+            print(f"Syllables: {metrics['syllables']}")
+            print(
+                "Flesch-Kincaid grade level:"
+                f" {round(metrics['flesch_kincaid'], 1)}"
+            )
+            print(f"Gunning Fog index: {round(metrics['gunning_fog'], 1)}")
+        else:
+            print("Readability scores are only available for English texts.")
 
         print(
             f"\nMost used words (lemmatized, not including very common words):"
         )
 
         counter = 0
-        for lemma, occurences in most_used_words:
+        for lemma, occurences in metrics["most_used_words"]:
             if counter < 15:
                 print(f"{lemma}: {occurences}")
             counter += 1
@@ -428,67 +638,524 @@ class Text:
         input("\nPress Enter to return to menu.\n")
 
     def count_words(self):
-        """Get total word count, unique word count, and word frequency"""
+        """Get word and sentence counts, word frequency, the number of content
+        words (words which are not stop words) and style metrics (syllables,
+        average word length and readability scores) in a single pass over the
+        words of the text
+        """
         total_words = 0
+        content_words = 0
 
-        # Tokenize text with nltk.tokenize. NLTK documentation: https://www.
-        # nltk.org/api/nltk.tokenize.html?highlight=tokenize#module-nltk.
-        # tokenize
-        tokenized_text = word_tokenize(self.text)
-        # Filter out common words by using stop words: https://pythonspot.com
-        # /nltk-stop-words/
-        stop_words = set(stopwords.words("english"))
+        stop_words = get_stop_words(self.language)
         lemmas = {}
         unique_words = set()
 
-        for word in tokenized_text:
-            if re.match(r"^[a-za-z]([\w-]*[a-za-z])?$", word):
-                total_words += 1
-                unique_words.add(word)
-                # Retrieve lemmas from WordNetLemmatizer: https://www.nltk.
-                # org/api/nltk.stem.wordnet.html?highlight=lemmatizer#nltk.stem.
-                # wordnet.WordNetLemmatizer
-                lemmatizer = WordNetLemmatizer()
-                lemma = lemmatizer.lemmatize(word)
-
-                if word not in stop_words and len(word) > 3:
-                    if lemma in lemmas:
-                        lemmas[lemma] += 1
-                    else:
-                        lemmas[lemma] = 1
+        # Total sentence count: https://stackoverflow.com/questions/15228054/
+        # how-to-count-the-amount-of-sentences-in-a-paragraph-in-python
+        # Sentences are separated by runs of [.!?], which the tokenizer
+        # yields as None between the words. Only sentences containing words
+        # are counted.
+        total_sentences = 0
+        sentence_lengths = set()
+        sentence_words = 0
+        all_words = 0
+        total_syllables = 0
+        total_characters = 0
+        complex_words = 0
+
+        for word in tokenize_words(self.text, sentences=True):
+            if word is None:
+                if sentence_words > 0:
+                    sentence_lengths.add(sentence_words)
+                    total_sentences += 1
+                sentence_words = 0
+                continue
+
+            # Sentence lengths and style metrics include all words:
+            all_words += 1
+            sentence_words += 1
+            syllables = count_syllables(word.lower())
+            total_syllables += syllables
+            total_characters += len(word)
+            if syllables >= 3:
+                complex_words += 1
+
+            # English word counts and word frequency only include words
+            # starting and ending with a lowercase letter. Other languages
+            # include capitalized words, e.g. German nouns:
+            if self.language != "en":
+                word = word.lower()
+            elif not (word[0].islower() and word[-1].islower()):
+                continue
+            total_words += 1
+            unique_words.add(word)
+
+            if word.lower() in stop_words:
+                continue
+            content_words += 1
+
+            if len(word) > 3:
+                lemma = get_lemma(word, self.language)
+                if lemma in lemmas:
+                    lemmas[lemma] += 1
+                else:
+                    lemmas[lemma] = 1
+
+        if sentence_words > 0:
+            sentence_lengths.add(sentence_words)
+            total_sentences += 1
+
         # Sort the dictionary: https://realpython.com/sort-python-dictionary/#
         # getting-keys-values-or-both-from-a-dictionary
         most_used_words = sorted(
             lemmas.items(), key=lambda item: item[1], reverse=True
         )
 
-        return total_words, unique_words, most_used_words
-
-    def count_sentences(self):
-        """Get total sentence count, longest/shortest sentence and average
-        words per sentence
+        # Readability formulas: https://en.wikipedia.org/wiki/Flesch%E2%80%93
+        # Kincaid_readability_tests and https://en.wikipedia.org/wiki/
+        # Gunning_fog_index
+        words_per_sentence = all_words / max(total_sentences, 1)
+        counted_words = max(all_words, 1)
+
+        return {
+            "total_words": total_words,
+            "unique_words": unique_words,
+            "most_used_words": most_used_words,
+            "content_words": content_words,
+            "total_sentences": total_sentences,
+            "sentence_lengths": sentence_lengths,
+            "words_per_sentence": words_per_sentence,
+            "syllables": total_syllables,
+            "word_length": total_characters / counted_words,
+            "flesch_kincaid": 0.39 * words_per_sentence
+            + 11.8 * total_syllables / counted_words
+            - 15.59,
+            "gunning_fog": 0.4
+            * (words_per_sentence + 100 * complex_words / counted_words),
+        }
+
+    def get_signature(self):
+        """Get the MinHash signature of the text. The signature is only
+        computed again when the text has changed.
         """
-        # Total sentence count: https://stackoverflow.com/questions/15228054/
-        # how-to-count-the-amount-of-sentences-in-a-paragraph-in-python
-        all_sentences = re.split(r"[.!?]+", self.text)
-        total_sentences = len(all_sentences)
-
-        # Longest/shortest sentences:
-        sentence_lengths = set()
-        for sentence in all_sentences:
-            words = re.findall(r"\w+", sentence)
-            if len(words) > 0:
-                sentence_lengths.add(len(words))
+        if self.signed_body is not self.body:
+            words = re.findall(r"\w+", self.text.lower())
+            shingles = {
+                hash(tuple(words[i:i + SHINGLE_SIZE])) % 2**32
+                for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))
+            }
+            # Each mask permutes the shingle hashes, the signature stores the
+            # minimum for each permutation:
+            self.signature = array(
+                "I",
+                (
+                    min(shingle ^ mask for shingle in shingles)
+                    for mask in HASH_MASKS
+                ),
+            )
+            self.signed_body = self.body
 
-        return total_sentences, sentence_lengths
+        return self.signature
 
     def save_text(self):
         """Save text to storage and go back to text selection"""
         storage[self.title] = self
+        similarity_index.add(self)
+        search_index.add(self)
 
         return "break"
 
 
+class SimilarityIndex:
+    """Finds similar texts in storage without comparing every pair of texts.
+    Texts are sorted into buckets by bands of their MinHash signatures, so
+    only texts sharing a bucket have to be compared. A bucket is stored as a
+    tuple of titles under the hash of its band, which takes much less memory
+    than a set for the many buckets holding a single text.
+
+    Methods:
+    - band_keys(): Get the bucket keys for a signature
+    - add(): Add a text to the index or update it
+    - remove(): Remove a text from the index
+    - find_similar(): Get similar texts and their estimated similarity
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.signatures = {}
+
+    def band_keys(self, signature):
+        """Get the bucket keys for a signature"""
+        rows = SIGNATURE_SIZE // SIGNATURE_BANDS
+        return {
+            hash((band, *signature[band * rows:(band + 1) * rows]))
+            for band in range(SIGNATURE_BANDS)
+        }
+
+    def add(self, text):
+        """Add a text to the index or update it"""
+        self.remove(text.title)
+        signature = text.get_signature()
+        for key in self.band_keys(signature):
+            self.buckets[key] = self.buckets.get(key, ()) + (text.title,)
+        # The signature is shared with the text. It is kept here as well, so
+        # that the buckets can be found again after the text has changed.
+        self.signatures[text.title] = signature
+
+    def remove(self, title):
+        """Remove a text from the index"""
+        signature = self.signatures.pop(title, None)
+        if signature is None:
+            return
+        for key in self.band_keys(signature):
+            titles = tuple(
+                other for other in self.buckets[key] if other != title
+            )
+            if titles:
+                self.buckets[key] = titles
+            else:
+                del self.buckets[key]
+
+    def find_similar(self, text):
+        """Get similar texts from storage, sorted by estimated similarity"""
+        signature = text.get_signature()
+        candidates = set()
+        for key in self.band_keys(signature):
+            candidates.update(self.buckets.get(key, ()))
+        candidates.discard(text.title)
+
+        similar_texts = []
+        for title in candidates:
+            # The share of equal signature values estimates the Jaccard
+            # similarity of the texts:
+            similarity = (
+                sum(map(operator.eq, signature, self.signatures[title]))
+                / SIGNATURE_SIZE
+            )
+            if similarity >= SIMILARITY_THRESHOLD:
+                similar_texts.append((title, similarity))
+
+        return sorted(similar_texts, key=lambda item: item[1], reverse=True)
+
+
+similarity_index = SimilarityIndex()
+
+
+class SearchIndex:
+    """Inverted index mapping lemmas to the stored texts containing them and
+    the word positions within each text. The postings of a lemma are kept in
+    a single byte array. For every text containing the lemma, it holds the
+    id of the text, the number of occurrences and the distance of each
+    position to the previous one as variable-length numbers:
+    https://en.wikipedia.org/wiki/LEB128
+
+    Methods:
+    - add(): Add a text to the index or update it
+    - remove(): Remove a text from the index
+    - compact(): Drop the postings of removed texts
+    - search(): Find texts containing a word or phrase
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.text_ids = {}
+        self.titles = {}
+        self.text_languages = {}
+        self.next_id = 0
+        self.removed = 0
+
+    def add(self, text):
+        """Add a text to the index or update it"""
+        self.remove(text.title)
+        text_positions = {}
+        for position, word in enumerate(
+            SEARCH_PATTERN.findall(text.text.lower())
+        ):
+            lemma = get_lemma(word, text.language)
+            text_positions.setdefault(lemma, []).append(position)
+
+        # Every added text gets a new id, so ids in the postings of removed
+        # texts are never reused:
+        text_id = self.next_id
+        self.next_id += 1
+        for lemma, positions in text_positions.items():
+            data = self.postings.setdefault(lemma, bytearray())
+            encode_posting(text_id, positions, data)
+        self.text_ids[text.title] = text_id
+        self.titles[text_id] = text.title
+        self.text_languages[text.title] = text.language
+
+    def remove(self, title):
+        """Remove a text from the index"""
+        text_id = self.text_ids.pop(title, None)
+        if text_id is None:
+            return
+        del self.titles[text_id]
+        del self.text_languages[title]
+        # The postings of removed texts are skipped by the search and only
+        # dropped once they make up half of the index:
+        self.removed += 1
+        if self.removed > len(self.titles):
+            self.compact()
+
+    def compact(self):
+        """Drop the postings of removed texts"""
+        for lemma, data in list(self.postings.items()):
+            compacted = bytearray()
+            for text_id, positions in decode_postings(data):
+                if text_id in self.titles:
+                    encode_posting(text_id, positions, compacted)
+            if compacted:
+                self.postings[lemma] = compacted
+            else:
+                del self.postings[lemma]
+        self.removed = 0
+
+    def search(self, query):
+        """Find texts containing all words of the query in the same order.
+        Returns a list of titles and number of matches, most matches first.
+        """
+        words = SEARCH_PATTERN.findall(query.lower())
+        results = []
+        # The query is lemmatized once for every language in storage and
+        # only matched against texts in that language:
+        for language in set(self.text_languages.values()):
+            lemmas = [get_lemma(word, language) for word in words]
+            if not lemmas or any(
+                lemma not in self.postings for lemma in lemmas
+            ):
+                continue
+
+            # Positions of each lemma in the texts containing all lemmas,
+            # starting with the rarest lemma:
+            lemma_positions = {}
+            text_ids = None
+            for lemma in sorted(
+                set(lemmas), key=lambda lemma: len(self.postings[lemma])
+            ):
+                lemma_positions[lemma] = {
+                    text_id: positions
+                    for text_id, positions in decode_postings(
+                        self.postings[lemma]
+                    )
+                    if text_ids is None or text_id in text_ids
+                }
+                text_ids = lemma_positions[lemma].keys()
+
+            for text_id in text_ids:
+                title = self.titles.get(text_id)
+                if title is None or self.text_languages[title] != language:
+                    continue
+                # Phrases start at the positions of the first word, which
+                # are followed by the other words at the right distance:
+                starts = set(lemma_positions[lemmas[0]][text_id])
+                for offset, lemma in enumerate(lemmas[1:], 1):
+                    starts.intersection_update(
+                        position - offset
+                        for position in lemma_positions[lemma][text_id]
+                    )
+                if starts:
+                    results.append((title, len(starts)))
+
+        return sorted(results, key=lambda item: item[1], reverse=True)
+
+
+search_index = SearchIndex()
+
+
+# Numbers in the search index are stored in 7-bit groups with the highest
+# bit marking that another group follows:
+def encode_number(number, data):
+    """Append a variable-length number to a byte array"""
+    while number >= 0x80:
+        data.append(number & 0x7F | 0x80)
+        number >>= 7
+    data.append(number)
+
+
+def decode_numbers(data):
+    """Yield the variable-length numbers stored in a byte array"""
+    number = 0
+    shift = 0
+    for byte in data:
+        number |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield number
+            number = 0
+            shift = 0
+
+
+def encode_posting(text_id, positions, data):
+    """Append the id of a text and the positions of a lemma in the text to
+    the postings of the lemma
+    """
+    encode_number(text_id, data)
+    encode_number(len(positions), data)
+    previous = 0
+    for position in positions:
+        encode_number(position - previous, data)
+        previous = position
+
+
+def decode_postings(data):
+    """Yield the text ids and lists of positions stored in the postings of a
+    lemma
+    """
+    numbers = decode_numbers(data)
+    for text_id in numbers:
+        positions = []
+        position = 0
+        for _ in range(next(numbers)):
+            position += next(numbers)
+            positions.append(position)
+        yield text_id, positions
+
+
+# Syllables are estimated by counting groups of vowels. Results are cached,
+# since most words occur many times in a text.
+@lru_cache(maxsize=None)
+def count_syllables(word):
+    """Estimate the number of syllables of a lowercase word"""
+    syllables = len(VOWEL_GROUPS.findall(word))
+    # Silent e at the end of a word, e.g. "phrase", but not "table" or "free":
+    if word.endswith("e") and not word.endswith(("le", "ee")):
+        syllables -= 1
+
+    return max(syllables, 1)
+
+
+# Lemmas are cached, since the same words are lemmatized over and over:
+# https://docs.python.org/3/library/functools.html#functools.lru_cache
+@lru_cache(maxsize=None)
+def get_lemma(word, language="en"):
+    """Get the lemma of a word in the given language"""
+    # Interned lemmas are shared by the search index of all texts:
+    # https://docs.python.org/3/library/sys.html#sys.intern
+    return sys.intern(get_lemmatizer(language)(word))
+
+
+def split_possessive(word):
+    """Split a word into its base and possessive ending, e.g. "Name's" into
+    "Name" and "'s"
+    """
+    match = POSSESSIVE_ENDING.search(word)
+    if match and match.start() > 0:
+        return word[:match.start()], match.group()
+
+    return word, ""
+
+
+def match_case(replacement, word):
+    """Apply the capitalization of a word to its replacement"""
+    if len(word) > 1 and word.isupper():
+        return replacement.upper()
+    elif word[0].isupper():
+        return replacement[0].upper() + replacement[1:]
+
+    return replacement
+
+
+# Recently used texts are kept decompressed. The compressed body is the key,
+# so a changed text is decompressed again.
+@lru_cache(maxsize=HOT_TEXTS)
+def decompress_text(body):
+    """Get the text from a compressed text body"""
+    return zlib.decompress(body).decode()
+
+
+def detect_language(text):
+    """Detect the language of a text by counting common words"""
+    words = re.findall(r"\w+", text[:DETECTION_SAMPLE].lower())
+    scores = {
+        language: sum(word in markers for word in words)
+        for language, markers in LANGUAGE_MARKERS.items()
+    }
+    language = max(scores, key=scores.get)
+
+    return language if scores[language] > 0 else "en"
+
+
+# The spreadsheet is only opened when texts are imported or exported, so
+# that run.py can be imported without credentials, e.g. by the scripts in
+# the testing folder:
+@lru_cache(maxsize=None)
+def get_sheet():
+    """Get the Google spreadsheet used as text storage"""
+    creds = Credentials.from_service_account_file("creds.json")
+    scoped_creds = creds.with_scopes(SCOPE)
+    gspread_client = gspread.authorize(scoped_creds)
+    return gspread_client.open("text-inspector-storage")
+
+
+# Language resources are only loaded when a text in that language is
+# processed. They are cached and shared by all texts in the session.
+@lru_cache(maxsize=None)
+def get_spell_checker(language):
+    """Get the spell checker for a language"""
+    # pyspellchecker documentation: https://pyspellchecker.readthedocs.io
+    # /en/latest/
+    return SpellChecker(language=language)
+
+
+@lru_cache(maxsize=None)
+def get_stop_words(language):
+    """Get the stop words for a language"""
+    # Filter out common words by using stop words: https://pythonspot.com
+    # /nltk-stop-words/
+    return frozenset(stopwords.words(LANGUAGES[language]))
+
+
+@lru_cache(maxsize=None)
+def get_lemmatizer(language):
+    """Get a function which returns the lemma of a word in a language"""
+    if language == "en":
+        # Retrieve lemmas from WordNetLemmatizer: https://www.nltk.org/api/
+        # nltk.stem.wordnet.html?highlight=lemmatizer#nltk.stem.wordnet.
+        # WordNetLemmatizer
+        return WordNetLemmatizer().lemmatize
+    # WordNet is only available in English, the other languages use the
+    # Snowball stemmers: https://www.nltk.org/api/nltk.stem.snowball.html
+    return SnowballStemmer(LANGUAGES[language]).stem
+
+
+def tokenize_words(text, fast=True, sentences=False):
+    """Yield the word tokens of a text.
+
+    Arguments:
+    - text: The text to tokenize (str)
+    - fast: Use the precompiled WORD_PATTERN instead of NLTK's word_tokenize()
+      (bool). Both modes yield the same words for the example texts, but the
+      fast mode doesn't know Punkt's abbreviations: For an abbreviation
+      within a sentence, e.g. "pears etc. and", it yields "etc", while NLTK
+      keeps "etc." as one token, which is not counted as a word.
+    - sentences: Also yield None for every run of sentence separators [.!?]
+      (bool)
+    """
+    if fast:
+        pattern = SENTENCE_PATTERN if sentences else WORD_PATTERN
+        for match in pattern.finditer(text):
+            word = match.group()
+            if word[0] in ".!?":
+                yield None
+                continue
+            split = CONTRACTIONS.get(word.lower())
+            parts = (word,) if split is None else (word[:split], word[split:])
+            for part in parts:
+                if part[0].isalpha() and part[-1].isalpha():
+                    yield part
+    else:
+        # Tokenize text with nltk.tokenize. NLTK documentation: https://www.
+        # nltk.org/api/nltk.tokenize.html?highlight=tokenize#module-nltk.
+        # tokenize
+        for word in word_tokenize(text):
+            if re.match(r"^[^\W\d_]([\w-]*[^\W\d_])?$", word):
+                yield word
+            elif sentences and re.match(r"^[.!?]+$", word):
+                yield None
+
+
 class Menu:
     """Creates a menu which generates menu options from passed functions.
 
@@ -650,6 +1317,8 @@ def load_text():
             try:
                 if confirm.lower() == "yes":
                     storage.pop(text)
+                    similarity_index.remove(text)
+                    search_index.remove(text)
                     print(
                         "The following text has been deleted:"
                         f" {colored(text, 'yellow')}."
@@ -671,6 +1340,61 @@ def load_text():
                 )
                 time.sleep(2)
 
+    def find_similar_texts(index):
+        titles = list(storage.keys())
+        text = storage[titles[index - 1]]
+        similar_texts = similarity_index.find_similar(text)
+
+        display_header()
+        print(f"Texts similar to {colored(text.title, 'yellow')}:\n")
+        if similar_texts:
+            for title, similarity in similar_texts:
+                print(f"{title}: {round(similarity * 100)}% similar")
+
+            # Texts are kept in storage in the order they were added:
+            earlier_versions = [
+                title
+                for title, similarity in similar_texts
+                if titles.index(title) < index - 1
+            ]
+            if earlier_versions:
+                print(
+                    "\nClosest earlier version:"
+                    f" {colored(earlier_versions[0], 'yellow')}"
+                )
+        else:
+            print(colored("No similar texts found.", "green"))
+        input("\nPress Enter to go back\n")
+
+    def search_texts():
+        while True:
+            query = input("Please enter a word or phrase to search for:\n")
+            try:
+                if len(query.strip()) == 0:
+                    raise ValueError
+                else:
+                    break
+            except ValueError:
+                print(
+                    colored(
+                        "The search can't be empty. Please enter a word or"
+                        " phrase.",
+                        "red",
+                    )
+                )
+
+        results = search_index.search(query)
+        numbers = {title: number for number, title in enumerate(storage, 1)}
+
+        display_header()
+        print(f"Texts containing {colored(query, 'yellow')}:\n")
+        if results:
+            for title, matches in results:
+                print(f"{numbers[title]}: {title} ({matches} matches)")
+        else:
+            print(colored("No texts found.", "green"))
+        input("\nPress Enter to go back\n")
+
     while True:
         display_header()
         print("Available texts:\n")
@@ -682,6 +1406,8 @@ def load_text():
             counter += 1
         print("\nPress 'd' to display a text")
         print("Press 's' to select a text")
+        print("Press 'f' to find similar texts")
+        print("Press 'w' to search for a word or phrase")
         print("Press 'x' to delete a text")
 
         option = input("\nPlease select an option:\n")
@@ -703,6 +1429,14 @@ def load_text():
                     return list(storage.values())[index - 1]
                 else:
                     raise ValueError
+            elif option == "f":
+                index = int(input("Please choose a text:\n"))
+                if index < counter:
+                    find_similar_texts(index)
+                else:
+                    raise ValueError
+            elif option == "w":
+                search_texts()
             elif option == "x":
                 index = int(input("Please choose a text:\n"))
                 if index < counter:
@@ -715,8 +1449,8 @@ def load_text():
         except ValueError:
             print(
                 colored(
-                    "Invalid choice. Please enter 'd', 's' or 'x' and then a"
-                    f" number between 1 and {counter - 1}.\n",
+                    "Invalid choice. Please enter 'd', 's', 'f', 'w' or 'x'"
+                    f" and then a number between 1 and {counter - 1}.\n",
                     "red",
                 )
             )
@@ -743,7 +1477,7 @@ def import_texts():
                             break
                         else:
                             recovery_key = user_input
-                            worksheet = SHEET.worksheet(recovery_key)
+                            worksheet = get_sheet().worksheet(recovery_key)
                             if worksheet:
                                 print("\nImporting texts ...")
                                 texts = worksheet.get_all_values()
@@ -751,7 +1485,12 @@ def import_texts():
                                     new_text = Text(False)
                                     new_text.title = text[0]
                                     new_text.text = text[1]
+                                    new_text.language = detect_language(
+                                        new_text.text
+                                    )
                                     storage[new_text.title] = new_text
+                                    similarity_index.add(new_text)
+                                    search_index.add(new_text)
                                     # Make recovery_key accessible on global
                                     # scope in order to reuse it for the next
                                     # export:
@@ -848,6 +1587,7 @@ def exit_program():
 def export_texts():
     """Export texts in storage to Google spreadsheet"""
     print(f"\nUpdating text storage ...")
+    sheet = get_sheet()
     # Check if variable is defined: https://stackoverflow.com/questions/
     # 1592565/determine-if-variable-is-defined-in-python
     try:
@@ -857,8 +1597,8 @@ def export_texts():
         else:
             # Delete the old worksheet: https://docs.gspread.org/en/latest/user
             # -guide.html#deleting-a-worksheet
-            worksheet = SHEET.worksheet(recovery_key)
-            SHEET.del_worksheet(worksheet)
+            worksheet = sheet.worksheet(recovery_key)
+            sheet.del_worksheet(worksheet)
             display_key_message = (
                 "You can use the same recovery key as before to restore them:"
                 f" {colored(recovery_key, 'yellow')}"
@@ -875,7 +1615,7 @@ def export_texts():
 
     # Create new worksheet in spreadsheet: https://docs.gspread.org/en/latest
     # /user-guide.html#creating-a-worksheet
-    worksheet = SHEET.add_worksheet(
+    worksheet = sheet.add_worksheet(
         title=recovery_key, rows=len(storage), cols=2
     )
 
@@ -909,6 +1649,7 @@ def main():
             True,
             False,
             current_text.spell_check,
+            current_text.grouped_spell_check,
             current_text.suggest_synonyms,
             current_text.display_metrics,
             current_text.save_text,
@@ -917,4 +1658,5 @@ def main():
         main_menu.display_menu()
 
 
-main()
+if __name__ == "__main__":
+    main()
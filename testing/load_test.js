@@ -0,0 +1,299 @@
+// ===================================================
+// Load test for Text Inspector
+//
+// Starts a local server with the Google API stubs from testing/stubs and
+// opens a growing number of concurrent sessions. Every session creates a
+// text from example1.txt, runs the spell check (skipping every error),
+// displays the text metrics and exits without exporting.
+//
+// Usage (from the repository root):
+//   node testing/load_test.js [--levels 1,2,4,8] [--port 8100] [--timeout 120]
+//
+// Requires Node.js 22 or the "ws" package from the devDependencies.
+// ===================================================
+
+const { spawn, execFileSync } = require('child_process');
+const fs = require('fs');
+const path = require('path');
+const http = require('http');
+
+const WebSocket = globalThis.WebSocket || require('ws');
+
+const ROOT = path.join(__dirname, '..');
+const CLOCK_TICKS = parseInt(execFileSync('getconf', ['CLK_TCK']).toString());
+const PAGE_SIZE = parseInt(execFileSync('getconf', ['PAGESIZE']).toString());
+
+const options = {
+    levels: [1, 2, 4, 8],
+    port: 8100,
+    timeout: 120
+};
+
+for (var i = 2; i < process.argv.length; i += 2) {
+    var name = process.argv[i].replace(/^--/, '');
+    var value = process.argv[i + 1];
+    if (name === 'levels')
+        options.levels = value.split(',').map(Number);
+    else if (name === 'port' || name === 'timeout')
+        options[name] = parseInt(value);
+    else
+        throw new Error('Unknown option: ' + process.argv[i]);
+}
+
+// Scripted run through the menus: each step waits for a prompt and then
+// sends the answer. Answers end with a carriage return like the Enter key.
+const SCRIPT = [
+    { name: 'start', prompt: /Please enter 'yes' or 'no'\./, send: 'no' },
+    { name: 'text selection', prompt: /Please choose an option:/, send: '1' },
+    { name: 'title', prompt: /Please enter a title for your text:/, send: 'Load test' },
+    { name: 'input method', prompt: /Please choose an option:/, send: '2' },
+    { name: 'file name', prompt: /Enter 'example1\.txt'/, send: 'example1.txt' },
+    { name: 'read file', prompt: /Press Enter to continue\./, send: '' },
+    { name: 'processing menu', prompt: /Please choose an option:/, send: '1' },
+    { name: 'spell check', spellCheck: true },
+    { name: 'processing menu', prompt: /Please choose an option:/, send: '4' },
+    { name: 'text metrics', prompt: /Press Enter to return to menu\./, send: '' },
+    { name: 'processing menu', prompt: /Please choose an option:/, send: '5' },
+    { name: 'text selection', prompt: /Please choose an option:/, send: '3' },
+    { name: 'exit', prompt: /Please enter 'yes' or 'no'\.\s+Enter 'b'/, send: 'no' }
+];
+
+// Remove terminal escape codes (colors, clear screen) from the output
+function stripAnsi(text) {
+    return text.replace(/\x1b\[[0-9;?]*[A-Za-z]/g, '');
+}
+
+// Run one scripted session and collect the latency of every step
+function runSession(port) {
+    return new Promise(function (resolve) {
+        var token = require('crypto').randomBytes(16).toString('hex');
+        var ws = new WebSocket('ws://localhost:' + port + '/?session=' + token);
+        var result = { firstScreen: null, steps: [], error: null };
+        var output = '';
+        var step = 0;
+        var sent = Date.now();
+        var opened = null;
+        var finished = false;
+        var timer = null;
+
+        function finish(error) {
+            if (finished)
+                return;
+            finished = true;
+            clearTimeout(timer);
+            result.error = error || null;
+            try {
+                ws.close();
+            } catch (e) {}
+            resolve(result);
+        }
+
+        function resetTimeout() {
+            clearTimeout(timer);
+            timer = setTimeout(function () {
+                finish('Timeout in step "' + (SCRIPT[step] || {}).name + '"');
+            }, options.timeout * 1000);
+        }
+
+        function answer(name, text) {
+            result.steps.push({ name: name, latency: Date.now() - sent });
+            output = '';
+            sent = Date.now();
+            resetTimeout();
+            ws.send(text + '\r');
+        }
+
+        // Check the output received so far against the current step
+        function advance() {
+            var current = SCRIPT[step];
+            if (!current)
+                return;
+
+            if (current.spellCheck) {
+                if (/Please choose an option:/.test(output) && /Possible spelling error/.test(output)) {
+                    answer('spell check prompt', 's');
+                } else if (/Press Enter to return to menu\./.test(output)) {
+                    answer('spell check result', '');
+                    step++;
+                }
+                return;
+            }
+
+            if (current.prompt.test(output)) {
+                if (step === 0)
+                    result.firstScreen = Date.now() - opened;
+                step++;
+                answer(current.name, current.send);
+            }
+        }
+
+        ws.onopen = function () {
+            opened = Date.now();
+            sent = opened;
+            resetTimeout();
+        };
+
+        ws.onmessage = function (event) {
+            output += stripAnsi(String(event.data));
+            advance();
+        };
+
+        ws.onerror = function (e) {
+            finish('WebSocket error: ' + (e.message || e.type));
+        };
+
+        ws.onclose = function () {
+            finish(step < SCRIPT.length ? 'Closed in step "' + SCRIPT[step].name + '"' : null);
+        };
+    });
+}
+
+function percentile(values, p) {
+    if (!values.length)
+        return NaN;
+    var sorted = values.slice().sort(function (a, b) {
+        return a - b;
+    });
+    return sorted[Math.min(sorted.length - 1, Math.ceil(p / 100 * sorted.length) - 1)];
+}
+
+// Cumulative CPU time in seconds and memory of the server and all its child
+// processes from /proc/<pid>/stat: https://man7.org/linux/man-pages/man5/
+// proc.5.html. The CPU time includes the children which have already ended,
+// so usage can be computed from the difference between two samples.
+function sampleProcesses(rootPid) {
+    var children = {};
+    var usage = {};
+    fs.readdirSync('/proc').forEach(function (pid) {
+        if (!/^\d+$/.test(pid))
+            return;
+        try {
+            var stat = fs.readFileSync('/proc/' + pid + '/stat', 'utf8');
+        } catch (e) {
+            // The process has ended in the meantime
+            return;
+        }
+        // Fields after the command name, starting with the state (field 3)
+        var fields = stat.slice(stat.lastIndexOf(')') + 2).split(' ');
+        var ppid = fields[1];
+        (children[ppid] = children[ppid] || []).push(pid);
+        usage[pid] = {
+            // utime, stime, cutime and cstime
+            cpu: (parseInt(fields[11]) + parseInt(fields[12]) + parseInt(fields[13]) + parseInt(fields[14])) / CLOCK_TICKS,
+            rss: parseInt(fields[21]) * PAGE_SIZE / 1024
+        };
+    });
+
+    var total = { time: Date.now(), rss: 0, cpu: 0, processes: 0 };
+    var pending = [String(rootPid)];
+    while (pending.length) {
+        var pid = pending.pop();
+        if (usage[pid]) {
+            total.rss += usage[pid].rss;
+            total.cpu += usage[pid].cpu;
+            total.processes++;
+        }
+        pending.push.apply(pending, children[pid] || []);
+    }
+    return total;
+}
+
+function waitForServer(port, retries) {
+    return new Promise(function (resolve, reject) {
+        http.get('http://localhost:' + port + '/', function (res) {
+            res.resume();
+            resolve();
+        }).on('error', function (err) {
+            if (retries <= 0)
+                return reject(err);
+            setTimeout(function () {
+                waitForServer(port, retries - 1).then(resolve, reject);
+            }, 500);
+        });
+    });
+}
+
+function format(ms) {
+    return isNaN(ms) ? '-' : (ms / 1000).toFixed(2) + 's';
+}
+
+async function runLevel(server, concurrency) {
+    var samples = [sampleProcesses(server.pid)];
+    var sampler = setInterval(function () {
+        samples.push(sampleProcesses(server.pid));
+    }, 500);
+
+    var started = Date.now();
+    var results = await Promise.all(Array.from({ length: concurrency }, function () {
+        return runSession(options.port);
+    }));
+    var duration = Date.now() - started;
+    clearInterval(sampler);
+    samples.push(sampleProcesses(server.pid));
+
+    var errors = results.filter(function (result) {
+        return result.error;
+    });
+    var firstScreens = results.map(function (result) {
+        return result.firstScreen;
+    }).filter(function (value) {
+        return value !== null;
+    });
+
+    console.log('\n== ' + concurrency + ' concurrent sessions (' + format(duration) + ', ' + errors.length + ' failed) ==');
+    errors.forEach(function (result) {
+        console.log('  Error: ' + result.error);
+    });
+    console.log('  Time to first screen: p50 ' + format(percentile(firstScreens, 50)) + ', p90 ' + format(percentile(firstScreens, 90)) + ', max ' + format(percentile(firstScreens, 100)));
+
+    var latencies = {};
+    results.forEach(function (result) {
+        result.steps.forEach(function (step) {
+            (latencies[step.name] = latencies[step.name] || []).push(step.latency);
+        });
+    });
+    console.log('  Step latencies (p50 / p90 / p99):');
+    for (var name in latencies) {
+        var values = latencies[name];
+        console.log('    ' + name.padEnd(20) + format(percentile(values, 50)) + ' / ' + format(percentile(values, 90)) + ' / ' + format(percentile(values, 99)) + ' (' + values.length + ')');
+    }
+
+    // CPU usage in percent of one core between two samples
+    var cpu = samples.slice(1).map(function (sample, i) {
+        return (sample.cpu - samples[i].cpu) / (sample.time - samples[i].time) * 100000;
+    });
+    var rss = samples.map(function (sample) {
+        return sample.rss;
+    });
+    var first = samples[0];
+    var last = samples[samples.length - 1];
+    console.log('  Server CPU: mean ' + ((last.cpu - first.cpu) / (last.time - first.time) * 100000).toFixed(0) + '%, max ' + Math.max.apply(null, cpu).toFixed(0) + '%');
+    console.log('  Server RSS: max ' + (Math.max.apply(null, rss) / 1024).toFixed(0) + ' MB');
+}
+
+async function main() {
+    var env = Object.assign({}, process.env, {
+        PORT: String(options.port),
+        PYTHONPATH: path.join(__dirname, 'stubs'),
+        MAX_SESSIONS: String(Math.max.apply(null, options.levels)),
+        // Reap sessions of failed clients right away
+        SESSION_GRACE_PERIOD: '0',
+        PWD: ROOT
+    });
+    delete env.CREDS;
+
+    var server = spawn('node', ['index.js'], { cwd: ROOT, env: env, stdio: 'ignore' });
+
+    try {
+        await waitForServer(options.port, 40);
+        for (var concurrency of options.levels)
+            await runLevel(server, concurrency);
+    } finally {
+        server.kill();
+    }
+}
+
+main().catch(function (err) {
+    console.error(err);
+    process.exit(1);
+});
@@ -0,0 +1,91 @@
+"""Measure the memory used by texts in storage.
+
+Run from the repository root (requires the Python dependencies and the
+NLTK modules, but no Google credentials):
+
+    python3 testing/storage_memory.py [number of texts]
+
+Compares the compact Text objects from run.py, together with their entries
+in the similarity and search indexes, with plain objects holding the
+uncompressed text in an instance dictionary and no indexes, as texts were
+stored before.
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from run import (  # noqa: E402
+    SEARCH_PATTERN,
+    SearchIndex,
+    SimilarityIndex,
+    Text,
+    detect_language,
+    get_lemma,
+)
+
+EXAMPLES = ["example1.txt", "example2.md"]
+
+
+class PlainText:
+    """A text stored as before: uncompressed and with an instance dict"""
+
+    def __init__(self, new_text):
+        pass
+
+
+def measure(text_class, examples, count, indexed):
+    """Get the memory in bytes used for storing count texts, including their
+    index entries if indexed is True
+    """
+    tracemalloc.start()
+    storage = {}
+    similarity_index = SimilarityIndex()
+    search_index = SearchIndex()
+    for i in range(count):
+        new_text = text_class(False)
+        new_text.title = f"Text {i}"
+        # Every text gets a unique ending, so that it is a separate string,
+        # as it would be when imported from the database:
+        new_text.text = examples[i % len(examples)] + f"\n{i}"
+        storage[new_text.title] = new_text
+        if indexed:
+            new_text.language = detect_language(new_text.text)
+            similarity_index.add(new_text)
+            search_index.add(new_text)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return used
+
+
+def main():
+    """Store the example texts many times and print the memory per text"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    examples = []
+    for file_name in EXAMPLES:
+        with open(file_name, "r") as f:
+            examples.append(f.read())
+
+    # Lemmas are cached for the whole session, so they are looked up before
+    # measuring:
+    for example in examples:
+        language = detect_language(example)
+        for word in SEARCH_PATTERN.findall(example.lower()):
+            get_lemma(word, language)
+
+    plain = measure(PlainText, examples, count, False) / count
+    stored = measure(Text, examples, count, False) / count
+    compact = measure(Text, examples, count, True) / count
+    print(f"Plain text objects: {plain / 1024:.1f} KiB per text")
+    print(f"Compact text objects: {stored / 1024:.1f} KiB per text")
+    print(
+        f"Compact text objects with index entries: {compact / 1024:.1f} KiB"
+        " per text"
+    )
+    print(f"Reduction: {plain / compact:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
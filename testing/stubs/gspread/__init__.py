@@ -0,0 +1,44 @@
+"""Stub of gspread for load testing. Worksheets are kept in memory."""
+
+
+class WorksheetNotFound(Exception):
+    pass
+
+
+class Worksheet:
+    def __init__(self, title):
+        self.title = title
+        self.rows = []
+
+    def get_all_values(self):
+        return [list(row) for row in self.rows]
+
+    def append_row(self, row):
+        self.rows.append(list(row))
+
+
+class Spreadsheet:
+    def __init__(self):
+        self.worksheets = {}
+
+    def worksheet(self, title):
+        try:
+            return self.worksheets[title]
+        except KeyError:
+            raise WorksheetNotFound(title)
+
+    def add_worksheet(self, title, rows, cols):
+        self.worksheets[title] = Worksheet(title)
+        return self.worksheets[title]
+
+    def del_worksheet(self, worksheet):
+        self.worksheets.pop(worksheet.title, None)
+
+
+class Client:
+    def open(self, title):
+        return Spreadsheet()
+
+
+def authorize(credentials):
+    return Client()
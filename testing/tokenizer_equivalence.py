@@ -0,0 +1,58 @@
+"""Check that the fast tokenizer yields the same words as NLTK.
+
+Run from the repository root (requires the Python dependencies and the
+NLTK modules, but no Google credentials):
+
+    python3 testing/tokenizer_equivalence.py [file ...]
+
+Without arguments the example texts are checked.
+"""
+import os
+import sys
+import time
+import difflib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from run import tokenize_words  # noqa: E402
+
+EXAMPLES = ["example1.txt", "example2.md"]
+
+
+def compare(file_name):
+    """Compare both tokenizer modes on a file and print the result"""
+    with open(file_name, "r") as f:
+        text = f.read()
+
+    start = time.perf_counter()
+    nltk_words = list(tokenize_words(text, fast=False))
+    nltk_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fast_words = list(tokenize_words(text))
+    fast_time = time.perf_counter() - start
+
+    equal = nltk_words == fast_words
+    print(
+        f"{file_name}: {len(nltk_words)} / {len(fast_words)} words,"
+        f" {len(set(nltk_words))} / {len(set(fast_words))} unique"
+        f" (NLTK / fast), {nltk_time * 1000:.1f} ms / {fast_time * 1000:.1f}"
+        f" ms -> {'OK' if equal else 'MISMATCH'}"
+    )
+    if not equal:
+        for line in difflib.unified_diff(
+            nltk_words, fast_words, "nltk", "fast", lineterm=""
+        ):
+            print(line)
+
+    return equal
+
+
+def main():
+    """Run the comparison for all given files"""
+    results = [compare(file_name) for file_name in sys.argv[1:] or EXAMPLES]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()